@@ -0,0 +1,426 @@
+import argparse
+import array
+import asyncio
+import collections
+import datetime
+import glob
+import heapq
+import json
+import os
+import re
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import websocket as ws
+from utils.logger import log_message
+from utils.message_record import EASTERN_TZ, format_timestamp
+
+CHUNK_SIZE = 64 * 1024  # Bytes read at a time from replayed files
+DRAIN_TIMEOUT = 5.0  # Seconds to wait for the receiver to catch up at the end
+
+
+def iter_json_array(filename, chunk_size=CHUNK_SIZE):
+    """Yield the objects of a JSON array file one at a time.
+
+    The file is read in chunks and decoded with raw_decode, so memory stays
+    at about one chunk plus one message however large the file is.
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, "r") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith("["):
+            raise ValueError(f"{filename} is not a JSON array")
+        pos = 1
+        eof = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The next message is split across chunks
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            if isinstance(item, dict):
+                yield item
+
+
+def message_time(message):
+    """Original receive time of a stored message in epoch seconds, or None."""
+    if message.get("ts") is not None:
+        return message["ts"] / 1_000_000
+
+    timestamp = message.get("timestamp")
+    if not timestamp:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            parsed = datetime.datetime.strptime(timestamp, fmt)
+        except ValueError:
+            continue
+        return EASTERN_TZ.localize(parsed).timestamp()
+    return None
+
+
+def day_files(date):
+    """Files holding the messages of a YYYY-MM-DD date.
+
+    Backups are copies of the cumulative message files taken as a day
+    starts, so a day's messages are in the first backup dated after it, or
+    only in the live files if there is no such backup yet.
+    """
+    filenames = []
+    for live_file in (ws.MESSAGES_FILE, ws.IGNORED_MESSAGES_FILE):
+        base = os.path.splitext(os.path.basename(live_file))[0]
+        later = []
+        pattern = os.path.join(ws.BACKUP_BASE_DIR, "*", "*", f"{base}_*.json")
+        for filename in glob.glob(pattern):
+            backup_date = os.path.basename(filename)[len(base) + 1 : -len(".json")]
+            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", backup_date) and backup_date > date:
+                later.append((backup_date, filename))
+
+        if later:
+            filenames.append(min(later)[1])
+        elif os.path.exists(live_file):
+            filenames.append(live_file)
+    return filenames
+
+
+def iter_messages(filenames):
+    """Yield (time, message) from all files, merged in original time order."""
+
+    def timed(filename):
+        for message in iter_json_array(filename):
+            yield message_time(message) or 0.0, message
+
+    return heapq.merge(*(timed(f) for f in filenames), key=lambda item: item[0])
+
+
+def eastern_time(sent_at, message):
+    """US/Eastern "YYYY-MM-DD HH:MM:SS" of a message, for filtering."""
+    if sent_at:
+        return format_timestamp(int(sent_at * 1_000_000))[:19]
+    return (message.get("timestamp") or "")[:19]
+
+
+def normalize_clock(value):
+    return value if value.count(":") == 2 else f"{value}:00"
+
+
+def matches(message, sent_at, args):
+    if args.sender and message.get("sender") not in args.sender:
+        return False
+    if (
+        args.ticker
+        and ws.normalize_ticker(message.get("ticker", "")) not in args.ticker
+    ):
+        return False
+    if args.type and message.get("type") not in args.type:
+        return False
+    if args.date or args.start or args.end:
+        stamp = eastern_time(sent_at, message)
+        if args.date and stamp[:10] != args.date:
+            return False
+        clock = stamp[11:]
+        if args.start and clock < args.start:
+            return False
+        if args.end and clock > args.end:
+            return False
+    return True
+
+
+class StubReceiver:
+    """Local stand-in for the downstream TCP server.
+
+    Accepts one EncryptedTcpClient connection, answers the auth frame with
+    AUTH_OK and records each forwarded frame with the time it arrived.
+    """
+
+    def __init__(self, host="127.0.0.1"):
+        self.server = socket.create_server((host, 0))
+        self.host = host
+        self.port = self.server.getsockname()[1]
+        self.received_at = collections.deque()
+        self.received = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _recv_exact(self, conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Client closed the connection")
+            data += chunk
+        return data
+
+    def _recv_frame(self, conn):
+        (length,) = struct.unpack("!I", self._recv_exact(conn, 4))
+        return self._recv_exact(conn, length) if length else b""
+
+    def _run(self):
+        conn, _ = self.server.accept()
+        with conn:
+            try:
+                self._recv_frame(conn)
+                conn.sendall(b"AUTH_OK")
+                while True:
+                    frame = self._recv_frame(conn)
+                    self.received_at.append((frame, time.perf_counter()))
+                    self.received += 1
+            except (ConnectionError, OSError):
+                pass
+
+    def close(self):
+        self.server.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50": round(percentile(ordered, 0.50), 3),
+        "p95": round(percentile(ordered, 0.95), 3),
+        "p99": round(percentile(ordered, 0.99), 3),
+        "max": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def collect_latencies(in_flight, receiver, latencies):
+    """Match received frames to injected messages by payload.
+
+    Priority lanes reorder frames, so they are matched on content rather
+    than arrival order. The payload carries the microsecond timestamp,
+    which makes it unique in practice.
+    """
+    while receiver.received_at:
+        frame, received_at = receiver.received_at.popleft()
+        pending = in_flight.get(frame)
+        if not pending:
+            continue
+        lane, injected_at = pending.popleft()
+        if not pending:
+            del in_flight[frame]
+        latencies[lane].append((received_at - injected_at) * 1000)
+
+
+def setup_pipeline(workdir):
+    """Point the ingest pipeline at throwaway state so live files are untouched."""
+    ws.sequence = ws.SequenceCounter(os.path.join(workdir, "sequence.json"))
+    ws.recent_messages = ws.RecentMessages(ws.RECENT_BUFFER_SIZE)
+    ws.TELEGRAM_BOT_TOKEN = None
+    if ws.symbol_master:
+        ws.reload_symbol_master()
+    return ws.get_ignore_index()
+
+
+def connect_client(host, port, secret):
+    ws.tcp_client = ws.EncryptedTcpClient(
+        tcp_host=host,
+        tcp_port=port,
+        shared_secret=secret,
+        client_name="replay_client",
+    )
+    ws.tcp_client.connect()
+    ws.forward_scheduler = ws.ForwardScheduler()
+    ws.forward_scheduler.start()
+
+
+async def replay(args, filenames):
+    receiver = None
+    in_flight = collections.defaultdict(collections.deque)
+    latencies = {lane: array.array("d") for lane in ws.ForwardScheduler.LANES}
+
+    if not args.dry_run:
+        if args.output == "stub":
+            receiver = StubReceiver()
+            receiver.start()
+            connect_client(receiver.host, receiver.port, ws.TCP_SECRET or "replay")
+        else:
+            log_message(
+                f"[REPLAY] Forwarding to the real TCP server {ws.TCP_HOST}:{ws.TCP_PORT}",
+                "WARNING",
+            )
+            connect_client(ws.TCP_HOST, ws.TCP_PORT, ws.TCP_SECRET)
+
+    loop = asyncio.get_running_loop()
+    replayed = 0
+    first_at = started_at = None
+    types = collections.Counter()
+    wall_started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ignore_index = setup_pipeline(workdir)
+
+        for sent_at, message in iter_messages(filenames):
+            if not matches(message, sent_at, args):
+                continue
+            if args.limit and replayed >= args.limit:
+                break
+
+            if args.speed and sent_at:
+                if first_at is None:
+                    first_at, started_at = sent_at, loop.time()
+                delay = started_at + (sent_at - first_at) / args.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            replayed += 1
+            types[message.get("type", "default")] += 1
+            if args.dry_run:
+                continue
+
+            accepted = ws.counters["accepted"]
+            injected_at = time.perf_counter()
+            record = ws.process_message(message, ignore_index, source="REPLAY")
+            if receiver and ws.counters["accepted"] > accepted:
+                frame = f"{record.to_json(include_internal=False)}<END>".encode()
+                lane = "high" if ws.is_high_priority(record) else "low"
+                in_flight[frame].append((lane, injected_at))
+                collect_latencies(in_flight, receiver, latencies)
+
+            # Saving is out of scope for a replay, keep memory flat
+            ws.pending_messages.clear()
+            ws.pending_ignored_messages.clear()
+            await asyncio.sleep(0)
+
+    elapsed = time.perf_counter() - wall_started
+
+    if receiver:
+        deadline = time.perf_counter() + DRAIN_TIMEOUT
+        while in_flight and time.perf_counter() < deadline:
+            collect_latencies(in_flight, receiver, latencies)
+            await asyncio.sleep(0.01)
+    if ws.forward_scheduler:
+        ws.forward_scheduler.stop()
+    if ws.tcp_client:
+        ws.tcp_client.disconnect()
+    if receiver:
+        receiver.close()
+
+    report = {
+        "files": filenames,
+        "replayed": replayed,
+        "elapsed_seconds": round(elapsed, 3),
+        "rate_per_second": round(replayed / elapsed, 1) if elapsed else 0.0,
+        "types": dict(types),
+    }
+    if not args.dry_run:
+        report["counters"] = dict(ws.counters)
+    if ws.forward_scheduler:
+        report["forward"] = ws.forward_scheduler.to_dict()
+    if receiver:
+        report["latency_ms"] = {
+            **latency_summary(latencies["high"] + latencies["low"]),
+            "lost": sum(len(pending) for pending in in_flight.values()),
+            "lanes": {lane: latency_summary(v) for lane, v in latencies.items()},
+        }
+    return report
+
+
+def parse_speed(value):
+    if value == "max":
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay stored messages through the ingest pipeline."
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--date", help="Replay the messages of a day (YYYY-MM-DD)")
+    source.add_argument(
+        "--file", action="append", help="Replay a message file (repeatable)"
+    )
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default=1.0,
+        help="Playback speed: 1 for real time, N for N times faster, or max",
+    )
+    parser.add_argument(
+        "--output",
+        choices=("stub", "forwarder"),
+        default="stub",
+        help="Forward to a local stand-in receiver (default) or the real TCP server",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only read, filter and pace messages; nothing is injected",
+    )
+    parser.add_argument("--sender", action="append", help="Only replay this sender")
+    parser.add_argument("--ticker", action="append", help="Only replay this ticker")
+    parser.add_argument("--type", action="append", help="Only replay this type")
+    parser.add_argument("--start", help="Skip messages before HH:MM[:SS] US/Eastern")
+    parser.add_argument("--end", help="Skip messages after HH:MM[:SS] US/Eastern")
+    parser.add_argument("--limit", type=int, help="Stop after this many messages")
+    parser.add_argument(
+        "--max-p99-ms",
+        type=float,
+        help="Exit with status 1 if the p99 forward latency is above this",
+    )
+    args = parser.parse_args(argv)
+
+    if args.date:
+        try:
+            datetime.datetime.strptime(args.date, "%Y-%m-%d")
+        except ValueError:
+            parser.error("--date must be YYYY-MM-DD")
+    if args.ticker:
+        args.ticker = {ws.normalize_ticker(ticker) for ticker in args.ticker}
+    if args.start:
+        args.start = normalize_clock(args.start)
+    if args.end:
+        args.end = normalize_clock(args.end)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.date:
+        filenames = day_files(args.date)
+        if not filenames:
+            sys.exit(f"No message files found for {args.date}")
+    else:
+        filenames = args.file or [ws.MESSAGES_FILE]
+
+    report = asyncio.run(replay(args, filenames))
+    print(json.dumps(report, indent=4))
+
+    p99 = report.get("latency_ms", {}).get("p99")
+    if args.max_p99_ms is not None and p99 is not None and p99 > args.max_p99_ms:
+        sys.exit(f"p99 latency {p99} ms is above {args.max_p99_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+
+
+def file_key(filename):
+    """Return (mtime_ns, size) for change detection, or None if missing."""
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
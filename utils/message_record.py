@@ -0,0 +1,151 @@
+import datetime
+import json
+import sys
+import time
+
+import pytz
+
+EASTERN_TZ = pytz.timezone("US/Eastern")
+
+_timestamp_cache = (None, "")
+
+
+def epoch_micros():
+    """Current time as integer microseconds since the epoch."""
+    return time.time_ns() // 1000
+
+
+def format_timestamp(ts):
+    """Format epoch microseconds as a US/Eastern timestamp string.
+
+    The timezone conversion is cached per second, so formatting a burst of
+    messages only pays for it once.
+    """
+    global _timestamp_cache
+
+    second, micros = divmod(ts, 1_000_000)
+    if _timestamp_cache[0] != second:
+        prefix = datetime.datetime.fromtimestamp(second, EASTERN_TZ).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        _timestamp_cache = (second, prefix)
+    return f"{_timestamp_cache[1]}.{micros:06d}"
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class MessageRecord:
+    """Compact in-memory representation of a message.
+
+    Uses __slots__ instead of a per-message dict, and interns the sender,
+    name, type, ticker and target strings, which repeat across messages.
+    The timestamp string is only formatted from `ts` when it is needed.
+    Messages loaded from older files without `ts` keep their original
+    timestamp string.
+
+    `old_message` is None when the key is absent, which is the case for
+    share-bearing orders. `unknown_ticker` marks tickers missing from the
+    symbol master.
+    """
+
+    __slots__ = (
+        "seq",
+        "ts",
+        "sender",
+        "name",
+        "type",
+        "ticker",
+        "shares",
+        "target",
+        "old_message",
+        "unknown_ticker",
+        "_timestamp",
+    )
+
+    def __init__(
+        self,
+        seq,
+        ts,
+        sender,
+        name,
+        message_type,
+        ticker,
+        shares=None,
+        target=None,
+        old_message=False,
+        timestamp=None,
+        unknown_ticker=False,
+    ):
+        self.seq = seq
+        self.ts = ts
+        self.sender = _intern(sender)
+        self.name = _intern(name)
+        self.type = _intern(message_type)
+        self.ticker = _intern(ticker)
+        self.shares = shares
+        self.target = _intern(target)
+        self.old_message = old_message
+        self.unknown_ticker = unknown_ticker
+        self._timestamp = timestamp
+
+    @property
+    def timestamp(self):
+        if self._timestamp is not None:
+            return self._timestamp
+        return format_timestamp(self.ts)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a stored or snapshotted message dict."""
+        ts = data.get("ts")
+        return cls(
+            seq=data.get("seq"),
+            ts=ts,
+            sender=data.get("sender"),
+            name=data.get("name"),
+            message_type=data.get("type"),
+            ticker=data.get("ticker"),
+            shares=data.get("shares"),
+            target=data.get("target"),
+            old_message=data.get("old_message"),
+            timestamp=None if ts is not None else data.get("timestamp"),
+            unknown_ticker=data.get("unknown_ticker", False),
+        )
+
+    def to_dict(self, include_internal=True, old_message=None):
+        """Convert to the message dict used on the wire and on disk.
+
+        `include_internal=False` leaves out the server-side `seq`, `ts` and
+        `unknown_ticker` fields. `old_message` overrides the stored flag when
+        it is given.
+        """
+        data = {}
+        if include_internal and self.seq is not None:
+            data["seq"] = self.seq
+            data["ts"] = self.ts
+        data["sender"] = self.sender
+        data["name"] = self.name
+        data["type"] = self.type
+        data["timestamp"] = self.timestamp
+        data["ticker"] = self.ticker
+
+        if old_message is not None:
+            data["old_message"] = old_message
+        elif self.old_message is not None:
+            data["old_message"] = self.old_message
+
+        if self.shares is not None:
+            data["shares"] = self.shares
+        if self.target is not None:
+            data["target"] = self.target
+        if include_internal and self.unknown_ticker:
+            data["unknown_ticker"] = True
+        return data
+
+    def to_json(self, include_internal=True, old_message=None):
+        return json.dumps(self.to_dict(include_internal, old_message))
+
+    def __repr__(self):
+        return f"MessageRecord({self.to_dict()!r})"
@@ -0,0 +1,167 @@
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+
+from utils.logger import log_message
+from utils.stats import LatencyTracker
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def thread_names():
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+class SamplingProfiler:
+    """Statistical profiler that periodically samples every thread's stack.
+
+    Stacks are aggregated in the folded format (`frame;frame;frame count`,
+    root first) used by flamegraph.pl and speedscope, so the result stays
+    small however long it runs. Only one profile runs at a time.
+    """
+
+    def __init__(self, interval=0.005, max_stacks=10000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.lock.locked()
+
+    def _sample(self, counts, names, own_id):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)))
+            stack = ";".join(reversed(labels))
+            if stack in counts or len(counts) < self.max_stacks:
+                counts[stack] += 1
+            else:
+                counts["[other stacks]"] += 1
+
+    def run(self, seconds):
+        """Sample for `seconds` and return the folded stacks as text.
+
+        Blocks the calling thread; raises RuntimeError if a profile is
+        already running.
+        """
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            counts = collections.Counter()
+            own_id = threading.get_ident()
+            names = thread_names()
+            samples = 0
+            ends_at = time.monotonic() + seconds
+            while time.monotonic() < ends_at:
+                self._sample(counts, names, own_id)
+                samples += 1
+                if samples % 100 == 0:
+                    names = thread_names()
+                time.sleep(self.interval)
+        finally:
+            self.lock.release()
+
+        lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+class LoopWatchdog:
+    """Measures event loop lag and captures what blocked it.
+
+    A task on the loop wakes every `interval` seconds and records how late
+    it woke up. A separate thread notices when that wake-up is more than
+    `threshold_ms` overdue and captures the loop thread's stack while it is
+    still blocked, so the culprit shows up in the log and in `stalls`.
+    """
+
+    def __init__(self, threshold_ms=100, interval=0.05, max_stalls=20, log_cooldown=60):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.log_cooldown = log_cooldown
+        self.lag = LatencyTracker(threshold_ms)
+        self.stalls = collections.deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self.loop_thread_id = None
+        self.next_beat = None
+        self.current_stall = None
+        self.last_logged = 0.0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    async def run(self):
+        self.loop_thread_id = threading.get_ident()
+        self.next_beat = time.monotonic() + self.interval
+        thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                with self.lock:
+                    now = time.monotonic()
+                    lag = max(0.0, now - self.next_beat)
+                    stall, self.current_stall = self.current_stall, None
+                    self.next_beat = now + self.interval
+
+                self.lag.record(lag * 1000)
+                if stall is not None:
+                    stall["duration_ms"] = round(lag * 1000, 1)
+        finally:
+            self.stop_event.set()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.interval / 2):
+            with self.lock:
+                blocked_for = time.monotonic() - self.next_beat
+                if self.current_stall is not None or blocked_for < self.threshold:
+                    continue
+                stall = self._capture(blocked_for)
+            self._log(stall)
+
+    def _capture(self, blocked_for):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        self.current_stall = {
+            "at": int(time.time() * 1000),
+            "blocked_ms": round(blocked_for * 1000, 1),
+            "duration_ms": None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.stalls.append(self.current_stall)
+        self.stall_count += 1
+        return self.current_stall
+
+    def _log(self, stall):
+        now = time.monotonic()
+        level = "WARNING" if now - self.last_logged >= self.log_cooldown else "INFO"
+        if level == "WARNING":
+            self.last_logged = now
+        log_message(
+            f"[WATCHDOG] Event loop blocked for {stall['blocked_ms']} ms, "
+            "loop thread stack:\n" + "\n".join(stall["stack"]),
+            level,
+        )
+
+    def to_dict(self, include_stacks=False):
+        stalls = list(self.stalls)
+        if not include_stacks:
+            stalls = [{k: v for k, v in s.items() if k != "stack"} for s in stalls]
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "lag": self.lag.to_dict(),
+            "stall_count": self.stall_count,
+            "stalls": stalls,
+        }
@@ -0,0 +1,203 @@
+import collections
+import datetime
+import heapq
+import time
+
+from utils.message_record import EASTERN_TZ
+
+
+class RollingWindow:
+    """Message and ignore counts over a sliding window of fixed time buckets.
+
+    The buckets form a ring, and a bucket is reset the first time it is
+    reused for a newer period, so memory stays fixed however many messages
+    pass through.
+    """
+
+    __slots__ = ("bucket_seconds", "periods", "counts", "ignored")
+
+    def __init__(self, buckets, bucket_seconds):
+        self.bucket_seconds = bucket_seconds
+        self.periods = [-1] * buckets
+        self.counts = [0] * buckets
+        self.ignored = [0] * buckets
+
+    def add(self, now, ignored):
+        period = int(now // self.bucket_seconds)
+        index = period % len(self.periods)
+        if self.periods[index] != period:
+            self.periods[index] = period
+            self.counts[index] = 0
+            self.ignored[index] = 0
+        self.counts[index] += 1
+        if ignored:
+            self.ignored[index] += 1
+
+    def totals(self, now):
+        """Return (count, ignored) over the window ending at now."""
+        oldest = int(now // self.bucket_seconds) - len(self.periods)
+        count = ignored = 0
+        for index, period in enumerate(self.periods):
+            if period > oldest:
+                count += self.counts[index]
+                ignored += self.ignored[index]
+        return count, ignored
+
+
+class KeyStats:
+    __slots__ = ("minute", "hour", "today", "ignored_today")
+
+    def __init__(self):
+        self.minute = RollingWindow(60, 1)
+        self.hour = RollingWindow(60, 60)
+        self.today = 0
+        self.ignored_today = 0
+
+    def add(self, now, ignored):
+        self.minute.add(now, ignored)
+        self.hour.add(now, ignored)
+        self.today += 1
+        if ignored:
+            self.ignored_today += 1
+
+    def to_dict(self, now):
+        minute, ignored_minute = self.minute.totals(now)
+        hour, ignored_hour = self.hour.totals(now)
+        return {
+            "minute": minute,
+            "hour": hour,
+            "today": self.today,
+            "ignored_minute": ignored_minute,
+            "ignored_hour": ignored_hour,
+            "ignored_today": self.ignored_today,
+            "ignore_rate_today": (
+                round(self.ignored_today / self.today, 4) if self.today else 0.0
+            ),
+        }
+
+
+class StatsAggregator:
+    """Live per-sender, per-ticker and per-type counters.
+
+    Counts cover the last minute, the last hour and today (US/Eastern),
+    including how many messages were ignored. Each dimension keeps at most
+    `max_keys` entries and evicts the least recently updated one, so memory
+    is bounded. Snapshots are cached for `cache_seconds` so frequent polling
+    stays cheap.
+    """
+
+    DIMENSIONS = ("senders", "tickers", "types")
+
+    def __init__(self, max_keys=500, top_tickers=50, cache_seconds=1.0):
+        self.max_keys = max_keys
+        self.top_tickers = top_tickers
+        self.cache_seconds = cache_seconds
+        self.total = KeyStats()
+        self.keys = {name: collections.OrderedDict() for name in self.DIMENSIONS}
+        self.day, self.day_ends_at = self._current_day()
+        self._cache = (0.0, None)
+
+    def _current_day(self):
+        """Return today's US/Eastern date and the epoch time it ends at."""
+        now = datetime.datetime.now(EASTERN_TZ)
+        midnight = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=1), datetime.time.min
+        )
+        return now.strftime("%Y-%m-%d"), EASTERN_TZ.localize(midnight).timestamp()
+
+    def _roll_day(self, now):
+        if now < self.day_ends_at:
+            return
+        self.day, self.day_ends_at = self._current_day()
+        for stats in (self.total, *self._all_key_stats()):
+            stats.today = 0
+            stats.ignored_today = 0
+
+    def _all_key_stats(self):
+        for keys in self.keys.values():
+            yield from keys.values()
+
+    def _add(self, dimension, key, now, ignored):
+        keys = self.keys[dimension]
+        stats = keys.get(key)
+        if stats is None:
+            if len(keys) >= self.max_keys:
+                keys.popitem(last=False)
+            stats = keys[key] = KeyStats()
+        else:
+            keys.move_to_end(key)
+        stats.add(now, ignored)
+
+    def record(self, sender, ticker, message_type, ignored=False):
+        now = time.time()
+        self._roll_day(now)
+        self.total.add(now, ignored)
+        self._add("senders", sender, now, ignored)
+        self._add("tickers", ticker, now, ignored)
+        self._add("types", message_type, now, ignored)
+
+    def snapshot(self):
+        """Return current counters as a dict, cached for cache_seconds."""
+        now = time.time()
+        cached_at, cached = self._cache
+        if cached is not None and now - cached_at < self.cache_seconds:
+            return cached
+
+        self._roll_day(now)
+        tickers = heapq.nlargest(
+            self.top_tickers,
+            self.keys["tickers"].items(),
+            key=lambda item: item[1].today,
+        )
+        snapshot = {
+            "day": self.day,
+            "generated_at": int(now * 1000),
+            "total": self.total.to_dict(now),
+            "senders": {k: v.to_dict(now) for k, v in self.keys["senders"].items()},
+            "tickers": {k: v.to_dict(now) for k, v in tickers},
+            "types": {k: v.to_dict(now) for k, v in self.keys["types"].items()},
+        }
+        self._cache = (now, snapshot)
+        return snapshot
+
+
+class LatencyTracker:
+    """Latency samples checked against a service level objective.
+
+    Keeps the last `samples` latencies for percentiles, plus running counts
+    of all samples and of those over `slo_ms`.
+    """
+
+    def __init__(self, slo_ms, samples=1024):
+        self.slo_ms = slo_ms
+        self.recent = collections.deque(maxlen=samples)
+        self.count = 0
+        self.breaches = 0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms):
+        self.recent.append(latency_ms)
+        self.count += 1
+        if latency_ms > self.slo_ms:
+            self.breaches += 1
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+
+    def to_dict(self):
+        ordered = sorted(self.recent)
+
+        def percentile(fraction):
+            if not ordered:
+                return 0.0
+            return round(
+                ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3
+            )
+
+        return {
+            "slo_ms": self.slo_ms,
+            "count": self.count,
+            "breaches": self.breaches,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
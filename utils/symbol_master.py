@@ -0,0 +1,53 @@
+import json
+
+from utils.files import file_key
+
+UNKNOWN_TICKER_ACTIONS = ("reject", "flag", "pass")
+
+
+def normalize_ticker(ticker):
+    """Return the canonical form of a ticker: stripped and upper-case."""
+    return str(ticker).strip().upper()
+
+
+class SymbolMaster:
+    """Known ticker symbols loaded from a file, with change-based reloads.
+
+    The file is either a JSON list (or object keyed by symbol) or plain text
+    with one symbol per line; blank lines and `#` comments are skipped.
+    Symbols are stored normalized in a frozenset, so a lookup is one hash
+    probe and a reload swaps the whole set at once.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.symbols = frozenset()
+        self.key = None
+
+    def __contains__(self, ticker):
+        return ticker in self.symbols
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _read_symbols(self):
+        with open(self.filename, "r") as f:
+            if self.filename.endswith(".json"):
+                return json.load(f)
+            return [
+                line.split(",")[0]
+                for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+
+    def reload_if_changed(self):
+        """Reload the symbols if the file changed. Returns True if reloaded."""
+        key = file_key(self.filename)
+        if key is None or key == self.key:
+            return False
+
+        self.symbols = frozenset(
+            normalize_ticker(symbol) for symbol in self._read_symbols() if symbol
+        )
+        self.key = key
+        return True
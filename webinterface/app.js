@@ -1,10 +1,28 @@
 let socket;
 let pushEnabled = false;
 let allMessages = [];
+let lastSeq = 0;
+let seenSeqs = new Set();
+let reconnectDelay = 1000;
 let currentPage = 1;
 let messagesPerPage = 10;
 let currentSort = { field: "timestamp", ascending: false };
 let config = null;
+let currentView = [];
+let viewFilters = null;
+let searchTimer = null;
+let renderPending = false;
+let rowHeight = 45;
+const messageIndex = {
+  bySender: new Map(),
+  byType: new Map(),
+  byDate: new Map(),
+};
+const SEARCH_DEBOUNCE_MS = 150;
+const ROW_OVERSCAN = 10;
+const RESUME_REBUILD_THRESHOLD = 200;
+const STATS_POLL_MS = 10000;
+let statsTimer = null;
 
 window.initApp = async function () {
   try {
@@ -42,6 +60,9 @@ window.initApp = async function () {
   const menuButton = document.getElementById("menu-button");
   const menuDropdown = document.getElementById("menu-dropdown");
   const senderFilter = document.getElementById("sender-filter");
+  const typeFilter = document.getElementById("type-filter");
+  const tableViewport = document.getElementById("table-viewport");
+  const statsBar = document.getElementById("stats-bar");
   const messageTarget = document.getElementById("message-target");
   const messageTableBody = document.getElementById("message-table-body");
 
@@ -133,7 +154,7 @@ window.initApp = async function () {
       updateDropdownBackground(dropdown);
     });
 
-    refreshTable();
+    renderVisibleRows();
   });
 
   themeObserver.observe(document.documentElement, {
@@ -205,10 +226,15 @@ window.initApp = async function () {
 
   // Setup event listeners on tool bar functions
   endDate.addEventListener("change", refreshTable);
-  pageSize.addEventListener("change", refreshTable);
+  pageSize.addEventListener("change", renderView);
   startDate.addEventListener("change", refreshTable);
-  searchInput.addEventListener("input", refreshTable);
+  typeFilter.addEventListener("change", refreshTable);
   senderFilter.addEventListener("change", refreshTable);
+  searchInput.addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(refreshTable, SEARCH_DEBOUNCE_MS);
+  });
+  tableViewport.addEventListener("scroll", scheduleRender);
 
   // Setup sorting
   document.querySelectorAll("th[data-sort]").forEach((th) => {
@@ -220,49 +246,127 @@ window.initApp = async function () {
         currentSort.field = field;
         currentSort.ascending = true;
       }
+      viewFilters = null;
       refreshTable();
     });
   });
 
   requestNotificationPermission();
 
-  // Connect to WebSocket with authentication
-  const wsUrl = new URL(window.env.WEBSOCKET_URL);
-  wsUrl.searchParams.set("token", auth.getToken());
-  socket = new WebSocket(wsUrl.toString());
+  connectSocket();
 
-  socket.onopen = function () {
-    console.log("Connected to WebSocket server");
-    if (pushEnabled) {
-      new Notification("WebSocket Connected", {
-        body: "You are now connected to the WebSocket server",
-      });
-    }
+  function trackSeq(message) {
+    if (!message.seq) return;
+    seenSeqs.add(message.seq);
+    lastSeq = Math.max(lastSeq, message.seq);
+  }
 
-    socket.send(JSON.stringify({ request_old_messages: true }));
-  };
+  function connectSocket() {
+    // Connect to WebSocket with authentication
+    const wsUrl = new URL(window.env.WEBSOCKET_URL);
+    wsUrl.searchParams.set("token", auth.getToken());
+    socket = new WebSocket(wsUrl.toString());
+
+    socket.onopen = function () {
+      console.log("Connected to WebSocket server");
+      reconnectDelay = 1000;
+      if (pushEnabled) {
+        new Notification("WebSocket Connected", {
+          body: "You are now connected to the WebSocket server",
+        });
+      }
 
-  socket.onmessage = function (event) {
-    const data = JSON.parse(event.data);
-    if (Array.isArray(data)) {
-      allMessages = data;
-    } else {
-      allMessages.unshift(data);
-    }
-    refreshTable();
-  };
+      // Resume from the last seen sequence id instead of re-downloading history
+      const request = { request_old_messages: true };
+      if (lastSeq > 0) request.since_seq = lastSeq;
+      socket.send(JSON.stringify(request));
+
+      requestStats();
+      clearInterval(statsTimer);
+      statsTimer = setInterval(requestStats, STATS_POLL_MS);
+    };
+
+    socket.onmessage = function (event) {
+      const data = JSON.parse(event.data);
+      if (Array.isArray(data)) {
+        allMessages = data;
+        seenSeqs = new Set();
+        data.forEach(trackSeq);
+        rebuildIndexes();
+        refreshTable();
+      } else if ("stats" in data) {
+        renderStats(data.stats);
+      } else if (Array.isArray(data.messages) && "since_seq" in data) {
+        // Live messages may arrive before the resume reply, skip duplicates
+        const missed = data.messages.filter(
+          (message) => !seenSeqs.has(message.seq),
+        );
+        const rebuild = missed.length > RESUME_REBUILD_THRESHOLD;
+        missed.forEach((message) => addMessage(message, !rebuild));
+        if (rebuild) {
+          viewFilters = null;
+          refreshTable();
+        }
+      } else if ("since_seq" in data && data.error) {
+        // Resume was rejected, fall back to the full history
+        console.error("Resume failed:", data.error);
+        socket.send(JSON.stringify({ request_old_messages: true }));
+      } else if (!data.seq || !seenSeqs.has(data.seq)) {
+        addMessage(data);
+        if (pushEnabled && !data.old_message && data.old_message === false) {
+          new Notification(data.name, {
+            body: `${data.type} ${data.ticker || "N/A"}`,
+          });
+        }
+      }
+    };
+
+    socket.onerror = function (error) {
+      console.error("WebSocket error:", error);
+    };
+
+    socket.onclose = function (event) {
+      if (event.code === 1008) {
+        // Unauthorized
+        console.log("WebSocket connection unauthorized");
+        auth.logout();
+        return;
+      }
 
-  socket.onerror = function (error) {
-    console.error("WebSocket error:", error);
-  };
+      clearInterval(statsTimer);
+      console.log(`WebSocket closed, reconnecting in ${reconnectDelay}ms`);
+      setTimeout(connectSocket, reconnectDelay);
+      reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+    };
+  }
 
-  socket.onclose = function (event) {
-    if (event.code === 1008) {
-      // Unauthorized
-      console.log("WebSocket connection unauthorized");
-      auth.logout();
+  function requestStats() {
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ request_stats: true }));
     }
-  };
+  }
+
+  function renderStats(stats) {
+    if (!stats) {
+      statsBar.textContent = "";
+      return;
+    }
+
+    const { total } = stats;
+    const ignoreRate = (total.ignore_rate_today * 100).toFixed(1);
+    const topTickers = Object.entries(stats.tickers)
+      .slice(0, 5)
+      .map(([ticker, counts]) => `${ticker} (${counts.today})`)
+      .join(", ");
+
+    const orders = stats.forward ? stats.forward.high : null;
+
+    statsBar.textContent =
+      `Last minute: ${total.minute} · Last hour: ${total.hour} · ` +
+      `Today: ${total.today} · Ignored today: ${ignoreRate}%` +
+      (orders ? ` · Order forward p99: ${orders.p99_ms} ms` : "") +
+      (topTickers ? ` · Top tickers: ${topTickers}` : "");
+  }
 
   sendButton.addEventListener("click", function () {
     const sender = senderDropdown.value;
@@ -289,80 +393,186 @@ window.initApp = async function () {
     }
   });
 
-  function refreshTable() {
-    messagesPerPage = parseInt(pageSize.value);
-    const currentTarget = getCurrentTarget();
+  function prepareMessage(message) {
+    // Cache derived fields once so filtering and sorting never re-parse
+    message._time = new Date(message.timestamp).getTime();
+    message._day = (message.timestamp || "").slice(0, 10);
+    message._ticker = (message.ticker || "").toLowerCase();
+  }
 
-    // Apply filters
-    let filteredMessages = allMessages.filter((message) => {
-      const searchTerm = searchInput.value.toLowerCase();
-      const senderFilterValue = senderFilter.value;
-      const startDateValue = startDate.value ? new Date(startDate.value) : null;
-      const endDateValue = endDate.value ? new Date(endDate.value) : null;
-
-      const targetMatches =
-        currentTarget === "unknown"
-          ? message.target && message.target in Object.keys(config.targets)
-          : !message.target
-            ? true
-            : message.target === currentTarget;
-
-      return (
-        (!searchTerm || message.ticker.toLowerCase().includes(searchTerm)) &&
-        (!senderFilterValue || message.sender === senderFilterValue) &&
-        (!startDateValue || new Date(message.timestamp) >= startDateValue) &&
-        (!endDateValue || new Date(message.timestamp) <= endDateValue) &&
-        targetMatches
-      );
+  function addToIndex(map, key, message) {
+    const bucket = map.get(key);
+    if (bucket) {
+      bucket.push(message);
+      return false;
+    }
+    map.set(key, [message]);
+    return true;
+  }
+
+  function indexMessage(message) {
+    prepareMessage(message);
+    addToIndex(messageIndex.bySender, message.sender, message);
+    addToIndex(messageIndex.byDate, message._day, message);
+    if (addToIndex(messageIndex.byType, message.type, message)) {
+      const option = document.createElement("option");
+      option.value = message.type;
+      option.textContent = message.type;
+      typeFilter.appendChild(option);
+    }
+  }
+
+  function rebuildIndexes() {
+    messageIndex.bySender.clear();
+    messageIndex.byType.clear();
+    messageIndex.byDate.clear();
+    typeFilter.length = 1;
+    allMessages.forEach(indexMessage);
+    viewFilters = null;
+  }
+
+  function addMessage(message, updateView = true) {
+    trackSeq(message);
+    allMessages.push(message);
+    indexMessage(message);
+    if (updateView) applyDelta(message);
+  }
+
+  function getFilters() {
+    return {
+      search: searchInput.value.toLowerCase(),
+      sender: senderFilter.value,
+      type: typeFilter.value,
+      start: startDate.value,
+      end: endDate.value,
+      target: getCurrentTarget(),
+    };
+  }
+
+  function matchesFilters(message, filters) {
+    const targetMatches =
+      filters.target === "unknown"
+        ? message.target && message.target in Object.keys(config.targets)
+        : !message.target
+          ? true
+          : message.target === filters.target;
+
+    return (
+      (!filters.search || message._ticker.includes(filters.search)) &&
+      (!filters.sender || message.sender === filters.sender) &&
+      (!filters.type || message.type === filters.type) &&
+      (!filters.start || message._day >= filters.start) &&
+      (!filters.end || message._day <= filters.end) &&
+      targetMatches
+    );
+  }
+
+  function messagesInDateRange(filters) {
+    const result = [];
+    messageIndex.byDate.forEach((messages, day) => {
+      if (
+        (!filters.start || day >= filters.start) &&
+        (!filters.end || day <= filters.end)
+      ) {
+        for (const message of messages) result.push(message);
+      }
     });
+    return result;
+  }
 
-    // Sort messages
-    filteredMessages.sort((a, b) => {
-      let aValue = a[currentSort.field];
-      let bValue = b[currentSort.field];
+  function candidateMessages(filters) {
+    // Narrowing the search only needs to re-check the current view
+    if (
+      viewFilters &&
+      filters.search.startsWith(viewFilters.search) &&
+      filters.sender === viewFilters.sender &&
+      filters.type === viewFilters.type &&
+      filters.start === viewFilters.start &&
+      filters.end === viewFilters.end &&
+      filters.target === viewFilters.target
+    ) {
+      return currentView;
+    }
+
+    // Otherwise start from the smallest matching index bucket
+    const candidates = [];
+    if (filters.sender) {
+      candidates.push(messageIndex.bySender.get(filters.sender) || []);
+    }
+    if (filters.type) {
+      candidates.push(messageIndex.byType.get(filters.type) || []);
+    }
+    if (filters.start || filters.end) {
+      candidates.push(messagesInDateRange(filters));
+    }
+    if (!candidates.length) return allMessages;
+    return candidates.reduce((a, b) => (a.length <= b.length ? a : b));
+  }
+
+  function compareMessages(a, b) {
+    let aValue = a[currentSort.field];
+    let bValue = b[currentSort.field];
 
-      if (currentSort.field === "timestamp") {
-        aValue = new Date(aValue);
-        bValue = new Date(bValue);
+    if (currentSort.field === "timestamp") {
+      aValue = a._time;
+      bValue = b._time;
+    }
+
+    let comparison = aValue < bValue ? -1 : aValue > bValue ? 1 : 0;
+    if (comparison === 0) comparison = (a.seq || 0) - (b.seq || 0);
+    return currentSort.ascending ? comparison : -comparison;
+  }
+
+  function refreshTable() {
+    const filters = getFilters();
+    const candidates = candidateMessages(filters);
+    const alreadySorted = candidates === currentView;
+
+    currentView = candidates.filter((message) =>
+      matchesFilters(message, filters),
+    );
+    if (!alreadySorted) currentView.sort(compareMessages);
+    viewFilters = filters;
+    renderView();
+  }
+
+  function applyDelta(message) {
+    // Insert a live message into the sorted view instead of rebuilding it
+    if (!viewFilters || !matchesFilters(message, viewFilters)) return;
+
+    let low = 0;
+    let high = currentView.length;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (compareMessages(currentView[mid], message) <= 0) {
+        low = mid + 1;
+      } else {
+        high = mid;
       }
+    }
+    currentView.splice(low, 0, message);
+    scheduleRender();
+  }
 
-      const comparison = aValue < bValue ? -1 : aValue > bValue ? 1 : 0;
-      return currentSort.ascending ? comparison : -comparison;
+  function scheduleRender() {
+    if (renderPending) return;
+    renderPending = true;
+    requestAnimationFrame(() => {
+      renderPending = false;
+      renderView();
     });
+  }
+
+  function renderView() {
+    messagesPerPage = parseInt(pageSize.value);
 
     // Update pagination
-    const totalPages = Math.ceil(filteredMessages.length / messagesPerPage);
+    const totalPages = Math.ceil(currentView.length / messagesPerPage);
     currentPage = Math.min(currentPage, totalPages);
     currentPage = currentPage === 0 && totalPages > 0 ? 1 : currentPage;
     updatePagination(totalPages);
 
-    // Display current page
-    const start = (currentPage - 1) * messagesPerPage;
-    const end = start + parseInt(messagesPerPage);
-    const pageMessages = filteredMessages.slice(start, end);
-
-    // Clear and repopulate table
-    messageTableBody.innerHTML = "";
-    pageMessages.forEach((message) => {
-      const isNewMessage =
-        !message.old_message && message.old_message === false;
-
-      addRowToTable(
-        message.name,
-        message.sender,
-        message.type,
-        message.ticker,
-        message.timestamp,
-      );
-
-      if (isNewMessage) {
-        if (pushEnabled) {
-          new Notification(message.name, {
-            body: `${message.type} ${message.ticker || "N/A"}`,
-          });
-        }
-      }
-    });
+    renderVisibleRows();
 
     // Update sort indicators
     document.querySelectorAll("th[data-sort]").forEach((th) => {
@@ -374,6 +584,54 @@ window.initApp = async function () {
     });
   }
 
+  function renderVisibleRows() {
+    // Only rows inside the scrolled viewport of the current page hit the DOM
+    const pageStart = Math.max(0, (currentPage - 1) * messagesPerPage);
+    const pageEnd = Math.min(currentView.length, pageStart + messagesPerPage);
+    const rowCount = Math.max(0, pageEnd - pageStart);
+    const viewportHeight = tableViewport.clientHeight || window.innerHeight;
+    const scrollTop = tableViewport.scrollTop;
+
+    const firstRow = Math.max(
+      0,
+      Math.floor(scrollTop / rowHeight) - ROW_OVERSCAN,
+    );
+    const lastRow = Math.min(
+      rowCount,
+      Math.ceil((scrollTop + viewportHeight) / rowHeight) + ROW_OVERSCAN,
+    );
+
+    const fragment = document.createDocumentFragment();
+    addSpacerRow(fragment, firstRow * rowHeight);
+    for (let i = firstRow; i < lastRow; i++) {
+      fragment.appendChild(createRow(currentView[pageStart + i]));
+    }
+    addSpacerRow(fragment, (rowCount - lastRow) * rowHeight);
+    messageTableBody.replaceChildren(fragment);
+
+    const sampleRow = messageTableBody.querySelector("tr:not(.spacer-row)");
+    if (sampleRow && sampleRow.offsetHeight) {
+      rowHeight = sampleRow.offsetHeight;
+    }
+  }
+
+  function addSpacerRow(fragment, height) {
+    if (height <= 0) return;
+    const row = document.createElement("tr");
+    const cell = document.createElement("td");
+    row.className = "spacer-row";
+    cell.colSpan = 4;
+    cell.style.height = `${height}px`;
+    row.appendChild(cell);
+    fragment.appendChild(row);
+  }
+
+  function goToPage(page) {
+    currentPage = page;
+    tableViewport.scrollTop = 0;
+    renderView();
+  }
+
   function updatePagination(totalPages) {
     const pagination = document.getElementById("pagination");
     pagination.innerHTML = "";
@@ -381,10 +639,7 @@ window.initApp = async function () {
     if (totalPages <= 1) return;
 
     // Previous button
-    addPaginationButton("«", currentPage > 1, () => {
-      currentPage--;
-      refreshTable();
-    });
+    addPaginationButton("«", currentPage > 1, () => goToPage(currentPage - 1));
 
     // Calculate visible page numbers
     let startPage = Math.max(1, currentPage - 2);
@@ -392,10 +647,7 @@ window.initApp = async function () {
     startPage = Math.max(1, endPage - 4);
 
     if (startPage > 1) {
-      addPaginationButton("1", true, () => {
-        currentPage = 1;
-        refreshTable();
-      });
+      addPaginationButton("1", true, () => goToPage(1));
       if (startPage > 2) {
         pagination.appendChild(document.createTextNode("..."));
       }
@@ -405,10 +657,7 @@ window.initApp = async function () {
       addPaginationButton(
         i.toString(),
         true,
-        () => {
-          currentPage = i;
-          refreshTable();
-        },
+        () => goToPage(i),
         i === currentPage,
       );
     }
@@ -417,17 +666,15 @@ window.initApp = async function () {
       if (endPage < totalPages - 1) {
         pagination.appendChild(document.createTextNode("..."));
       }
-      addPaginationButton(totalPages.toString(), true, () => {
-        currentPage = totalPages;
-        refreshTable();
-      });
+      addPaginationButton(totalPages.toString(), true, () =>
+        goToPage(totalPages),
+      );
     }
 
     // Next button
-    addPaginationButton("»", currentPage < totalPages, () => {
-      currentPage++;
-      refreshTable();
-    });
+    addPaginationButton("»", currentPage < totalPages, () =>
+      goToPage(currentPage + 1),
+    );
   }
 
   function addPaginationButton(text, enabled, onClick, isActive = false) {
@@ -439,7 +686,14 @@ window.initApp = async function () {
     document.getElementById("pagination").appendChild(button);
   }
 
-  function addRowToTable(name, sender, type, ticker, timestamp) {
+  function createRow({
+    name,
+    sender,
+    type,
+    ticker,
+    timestamp,
+    unknown_ticker: unknownTicker,
+  }) {
     const row = document.createElement("tr");
     const senderCell = document.createElement("td");
     const typeCell = document.createElement("td");
@@ -449,6 +703,10 @@ window.initApp = async function () {
     senderCell.textContent = name || config.senders[sender]?.name || sender;
     typeCell.textContent = type;
     tickerCell.textContent = ticker || "N/A";
+    if (unknownTicker) {
+      tickerCell.classList.add("unknown-ticker");
+      tickerCell.title = "Not in the symbol master";
+    }
     timestampCell.textContent = formatDate(timestamp);
 
     const senderConfig = config.senders[sender];
@@ -463,7 +721,7 @@ window.initApp = async function () {
     row.appendChild(typeCell);
     row.appendChild(tickerCell);
     row.appendChild(timestampCell);
-    messageTableBody.appendChild(row);
+    return row;
   }
 
   async function requestNotificationPermission() {
@@ -1,21 +1,30 @@
 import asyncio
+import collections
 import datetime
 import hashlib
+import http
 import json
 import os
 import shutil
 import socket
+import stat
 import struct
 import threading
 import time
+import urllib.parse
 
-import pytz
+import jwt
 import websockets
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from dotenv import load_dotenv
 
+from utils.files import file_key
 from utils.logger import log_message
+from utils.message_record import MessageRecord, epoch_micros
+from utils.profiling import LoopWatchdog, SamplingProfiler
+from utils.stats import LatencyTracker, StatsAggregator
+from utils.symbol_master import UNKNOWN_TICKER_ACTIONS, SymbolMaster, normalize_ticker
 from utils.telegram_sender import send_telegram_message
 
 load_dotenv()
@@ -24,6 +33,8 @@ load_dotenv()
 MESSAGES_FILE = "data/websocket_messages.json"
 IGNORED_MESSAGES_FILE = "data/ignored_messages.json"
 IGNORE_LIST_FILE = "data/ignore_list.json"
+SEQUENCE_FILE = "data/sequence.json"
+STATE_SNAPSHOT_FILE = "data/state_snapshot.json"
 BACKUP_BASE_DIR = "data/backup"
 WS_HOST = os.getenv("WS_HOST", "0.0.0.0")
 WS_PORT = int(os.getenv("WS_PORT", 8080))
@@ -32,7 +43,38 @@ TCP_PORT = int(os.getenv("TCP_PORT", 3005))
 TCP_SECRET = os.getenv("TCP_SECRET")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+JWT_SECRET = os.getenv("JWT_SECRET", "JUST_SOME_RANDOM_FUCKING_KEY-LOL")
 SAVE_DELAY = 5.0  # Seconds to wait before saving messages
+SEQUENCE_RESERVE = 1000  # Sequence ids reserved per write to SEQUENCE_FILE
+RECENT_BUFFER_SIZE = int(os.getenv("RECENT_BUFFER_SIZE", 5000))
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", 60))
+SNAPSHOT_VERSION = 1
+FORWARD_BACKLOG_SIZE = int(os.getenv("FORWARD_BACKLOG_SIZE", 1000))
+FORWARD_BACKLOG_MAX_AGE = float(os.getenv("FORWARD_BACKLOG_MAX_AGE", 30))
+HIGH_PRIORITY_SENDERS = frozenset(
+    sender.strip()
+    for sender in os.getenv("HIGH_PRIORITY_SENDERS", "").split(",")
+    if sender.strip()
+)
+FORWARD_SLO_HIGH_MS = float(os.getenv("FORWARD_SLO_HIGH_MS", 5))
+FORWARD_SLO_LOW_MS = float(os.getenv("FORWARD_SLO_LOW_MS", 100))
+FORWARD_WARNING_INTERVAL = 60  # Seconds between "not connected" warnings
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 20))
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", 20))
+HEARTBEAT_TICK = 1.0  # Seconds per timer wheel slot
+IDLE_TIMEOUT = float(os.getenv("IDLE_TIMEOUT", 0))  # 0 disables idle reaping
+WRITE_BUFFER_HIGH_WATER = int(os.getenv("WRITE_BUFFER_HIGH_WATER", 1024 * 1024))
+SYMBOL_MASTER_FILE = os.getenv("SYMBOL_MASTER_FILE")
+SYMBOL_MASTER_RELOAD_INTERVAL = float(os.getenv("SYMBOL_MASTER_RELOAD_INTERVAL", 30))
+UNKNOWN_TICKER_ACTION = os.getenv("UNKNOWN_TICKER_ACTION", "flag").lower()
+STATS_MAX_KEYS = int(os.getenv("STATS_MAX_KEYS", 500))
+UDS_PATH = os.getenv("UDS_PATH")
+UDS_MODE = int(os.getenv("UDS_MODE", "660"), 8)
+UDS_MAX_FRAME = int(os.getenv("UDS_MAX_FRAME", 1024 * 1024))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", 100))
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", 0.05))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
 
 # In-memory message queues
 pending_messages = []
@@ -40,6 +82,38 @@ pending_ignored_messages = []
 last_actual_message_time = datetime.datetime.now()
 save_task = None
 backup_task = None
+sequence = None
+recent_messages = None
+ignore_list = {}
+ignore_list_key = None
+ignore_index = {}
+symbol_master = SymbolMaster(SYMBOL_MASTER_FILE) if SYMBOL_MASTER_FILE else None
+history_cache = (None, [])
+history_saving = False
+counters = {
+    "received": 0,
+    "accepted": 0,
+    "ignored": 0,
+    "rejected": 0,
+    "unknown_ticker": 0,
+    "forwarded": 0,
+    "forward_dropped": 0,
+}
+connection_metrics = {
+    "connected": 0,
+    "pings_sent": 0,
+    "reaped_heartbeat_timeout": 0,
+    "reaped_idle": 0,
+    "reaped_slow_consumer": 0,
+    "broadcast_skipped": 0,
+    "uds_connected": 0,
+}
+heartbeat_wheel = None
+forward_scheduler = None
+last_forward_warning = 0.0
+stats = StatsAggregator(max_keys=STATS_MAX_KEYS)
+loop_watchdog = LoopWatchdog(LOOP_LAG_THRESHOLD_MS, LOOP_WATCHDOG_INTERVAL)
+profiler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
 
 
 # NOTE: Ghaffar's client if he change anything later on ask him for the client code
@@ -68,9 +142,8 @@ class EncryptedTcpClient:
     def _send_length_prefixed(self, data: bytes):
         if not self.sock:
             raise ConnectionError("Not connected to server")
-        self.sock.sendall(struct.pack("!I", len(data)))
-        if data:
-            self.sock.sendall(data)
+        # One write per frame, so the payload never waits on a delayed ACK
+        self.sock.sendall(struct.pack("!I", len(data)) + data)
 
     # ---------- Core ----------
     def connect(self):
@@ -81,6 +154,7 @@ class EncryptedTcpClient:
                     "INFO",
                 )
                 self.sock = socket.create_connection((self.tcp_host, self.tcp_port))
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 log_message(
                     f"[TCP] Connected to {self.tcp_host}:{self.tcp_port}", "INFO"
                 )
@@ -121,13 +195,16 @@ class EncryptedTcpClient:
         log_message(f"Server reply: {server_reply}", "INFO")
         return b"AUTH_OK" in reply
 
+    def send_frame(self, message: str):
+        """Send one message, raising if the connection is lost."""
+        if not message.endswith("<END>"):
+            message += "<END>"
+        self._send_length_prefixed(message.encode())
+        log_message(f"Sent: {message}", "INFO")
+
     def send_message(self, message: str):
         try:
-            if not message.endswith("<END>"):
-                message += "<END>"
-            data = message.encode()
-            self._send_length_prefixed(data)
-            log_message(f"Sent: {message}", "INFO")
+            self.send_frame(message)
         except (BrokenPipeError, ConnectionError, OSError) as e:
             log_message(f"Lost connection while sending: {e}", "ERROR")
             self.connected = False
@@ -168,6 +245,86 @@ class EncryptedTcpClient:
         log_message("[TCP] Client disconnected", "INFO")
 
 
+class SequenceCounter:
+    """Persistent, monotonic message sequence ids.
+
+    Ids are reserved from SEQUENCE_FILE in blocks so the file is only
+    rewritten once every `reserve` messages. After a restart numbering
+    resumes past the last reserved block, so ids may skip but never repeat.
+    """
+
+    def __init__(self, filename, reserve=SEQUENCE_RESERVE):
+        self.filename = filename
+        self.reserve = reserve
+        self.last_seq = self._load()
+        self.reserved_until = self.last_seq
+
+    def _load(self):
+        try:
+            with open(self.filename, "r") as f:
+                return int(json.load(f)["reserved_until"])
+        except FileNotFoundError:
+            return 0
+        except (KeyError, TypeError, ValueError) as e:
+            log_message(f"[SEQ] Invalid sequence file {self.filename}: {e}", "ERROR")
+            return 0
+
+    def _persist(self, value):
+        write_file_atomic(self.filename, json.dumps({"reserved_until": value}))
+
+    def next(self):
+        self.last_seq += 1
+        if self.last_seq > self.reserved_until:
+            self.reserved_until = self.last_seq + self.reserve - 1
+            self._persist(self.reserved_until)
+        return self.last_seq
+
+
+class RecentMessages:
+    """Bounded buffer of the latest accepted messages, ordered by seq.
+
+    Every accepted message with a seq greater than `floor_seq` is in the
+    buffer, which lets reconnecting clients resume from memory.
+    """
+
+    def __init__(self, maxlen, floor_seq=0):
+        self.messages = collections.deque(maxlen=maxlen)
+        self.floor_seq = floor_seq
+
+    def append(self, message):
+        if len(self.messages) == self.messages.maxlen:
+            self.floor_seq = self.messages[0].seq
+        self.messages.append(message)
+
+    def since(self, since_seq):
+        """Return messages with seq > since_seq, or None if not fully buffered."""
+        if since_seq < self.floor_seq:
+            return None
+
+        missed = []
+        for message in reversed(self.messages):
+            if message.seq <= since_seq:
+                break
+            missed.append(message)
+        missed.reverse()
+        return missed
+
+
+def write_file_atomic(filename, content):
+    """Write content to filename via a temp file so readers never see a partial file.
+
+    `content` is a string, or a callable that writes to the open temp file.
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    temp_file = f"{filename}.tmp"
+    with open(temp_file, "w") as f:
+        if callable(content):
+            content(f)
+        else:
+            f.write(content)
+    os.replace(temp_file, filename)
+
+
 def load_messages(filename):
     """Load messages from JSON file."""
     try:
@@ -186,27 +343,84 @@ def load_ignore_list():
         return {}
 
 
-def should_ignore_message(sender, ticker, ignore_list):
-    """Check if message should be ignored based on sender and ticker."""
-    if sender in ignore_list:
-        return ticker.lower() in [t.lower() for t in ignore_list[sender]]
-    return False
+def build_ignore_index(raw_ignore_list):
+    """Map each sender to a frozenset of its ignored tickers, normalized."""
+    return {
+        sender: frozenset(normalize_ticker(ticker) for ticker in tickers)
+        for sender, tickers in raw_ignore_list.items()
+    }
 
 
-def save_messages_to_file(messages, filename):
-    """Save collected messages to the specified JSON file."""
-    if not messages:
-        return
+def get_ignore_index():
+    """Return the ignore index, reloading it only when the file changes."""
+    global ignore_list, ignore_list_key, ignore_index
 
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    key = file_key(IGNORE_LIST_FILE)
+    if key != ignore_list_key:
+        ignore_list = load_ignore_list()
+        ignore_index = build_ignore_index(ignore_list)
+        ignore_list_key = key
+    return ignore_index
 
-    existing_messages = load_messages(filename)
-    existing_messages.extend(messages)
 
-    with open(filename, "w") as f:
-        json.dump(existing_messages, f, indent=4)
+def load_history():
+    """Load MESSAGES_FILE as records, reusing them while the file is unchanged."""
+    global history_cache
+
+    if history_saving:
+        # The save in progress updates the cache once the file is replaced
+        return history_cache[1]
+
+    key = file_key(MESSAGES_FILE)
+    if key is None or key != history_cache[0]:
+        records = [MessageRecord.from_dict(m) for m in load_messages(MESSAGES_FILE)]
+        history_cache = (key, records)
+    return history_cache[1]
+
+
+def should_ignore_message(sender, ticker, ignore_index):
+    """Check if message should be ignored based on sender and normalized ticker."""
+    ignored = ignore_index.get(sender)
+    return ignored is not None and ticker in ignored
+
+
+def reload_symbol_master():
+    """Reload the symbol master if its file changed."""
+    try:
+        if symbol_master.reload_if_changed():
+            log_message(
+                f"[SYMBOLS] Loaded {len(symbol_master)} symbols from {SYMBOL_MASTER_FILE}",
+                "INFO",
+            )
+    except (OSError, ValueError) as e:
+        log_message(f"[SYMBOLS] Failed to load {SYMBOL_MASTER_FILE}: {e}", "ERROR")
+
+
+async def symbol_master_reload_task():
+    """Hot reload the symbol master when the file changes."""
+    while True:
+        await asyncio.sleep(SYMBOL_MASTER_RELOAD_INTERVAL)
+        await asyncio.to_thread(reload_symbol_master)
 
-    # Send notification about saved messages
+
+def write_messages_file(messages, filename, history=None):
+    """Write a message file with messages appended and return its file key.
+
+    With `history`, the records already in MESSAGES_FILE, the file is rebuilt
+    from records; otherwise the existing file is read and extended.
+    """
+    if history is not None:
+        existing_messages = [record.to_dict() for record in history]
+    else:
+        existing_messages = load_messages(filename)
+    existing_messages.extend(record.to_dict() for record in messages)
+
+    write_file_atomic(filename, lambda f: json.dump(existing_messages, f, indent=4))
+    return file_key(filename)
+
+
+def notify_saved(messages, filename):
+    """Send notification about saved messages."""
     if filename == MESSAGES_FILE and TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
         asyncio.create_task(
             send_telegram_message(
@@ -217,6 +431,58 @@ def save_messages_to_file(messages, filename):
         )
 
 
+def save_messages_to_file(messages, filename):
+    """Save collected messages to the specified JSON file."""
+    if not messages:
+        return
+
+    global history_cache
+
+    if filename == MESSAGES_FILE:
+        history = load_history()
+        key = write_messages_file(messages, filename, history)
+        history_cache = (key, history + messages)
+    else:
+        write_messages_file(messages, filename)
+
+    notify_saved(messages, filename)
+
+
+async def save_pending_messages(pending, filename):
+    """Save the pending messages from a worker thread, then remove them.
+
+    The event loop keeps ingesting while the file is serialized and written.
+    Saved messages stay in `pending`, and the history cache is not reloaded,
+    until the new file is in place, so full loads never miss or duplicate
+    them. A cancelled save still finishes its write.
+    """
+    global history_cache, history_saving
+
+    messages = pending.copy()
+    history = None
+    if filename == MESSAGES_FILE:
+        history = load_history()
+        history_saving = True
+
+    write = asyncio.ensure_future(
+        asyncio.to_thread(write_messages_file, messages, filename, history)
+    )
+    try:
+        await asyncio.shield(write)
+    except asyncio.CancelledError:
+        await write
+        raise
+    finally:
+        history_saving = False
+        if write.done() and not write.cancelled() and write.exception() is None:
+            if history is not None:
+                history_cache = (write.result(), history + messages)
+            del pending[: len(messages)]
+
+    notify_saved(messages, filename)
+    return len(messages)
+
+
 def create_backup_path(date_obj):
     """Create backup path based on date: data/backup/YYYY/MM/filename_YYYY-MM-DD.json"""
     year = date_obj.strftime("%Y")
@@ -285,113 +551,706 @@ async def daily_backup_task():
             await asyncio.sleep(3600)
 
 
+def load_old_messages():
+    """Load the full message history, including messages not yet saved."""
+    return load_history() + pending_messages
+
+
+def parse_since_seq(value):
+    """Return `value` as a non-negative sequence id, or None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdecimal():
+        try:
+            return int(value)
+        except ValueError:
+            # Longer than Python's int string conversion limit
+            return None
+    if isinstance(value, int) and value >= 0:
+        return value
+    return None
+
+
+def get_messages_since(since_seq):
+    """Return accepted messages with seq > since_seq, oldest first.
+
+    Served from the in-memory buffer when it covers the gap, so the cost is
+    proportional to what the client missed. Older gaps fall back to history.
+    """
+    missed = recent_messages.since(since_seq)
+    if missed is not None:
+        return missed
+    return [msg for msg in load_old_messages() if (msg.seq or 0) > since_seq]
+
+
+def is_high_priority(record):
+    """Share-bearing orders and configured senders take the high lane."""
+    return record.shares is not None or record.sender in HIGH_PRIORITY_SENDERS
+
+
+def forward_message(record):
+    """Queue a message for forwarding over TCP in its priority lane."""
+    # seq and ts are server-side bookkeeping, the downstream format stays as is
+    payload = record.to_json(include_internal=False)
+    lane = "high" if is_high_priority(record) else "low"
+    forward_scheduler.submit(lane, record.ts, payload)
+    if not (tcp_client and tcp_client.connected):
+        warn_not_connected()
+
+
+def warn_not_connected():
+    """Warn that messages are queued, at most once per FORWARD_WARNING_INTERVAL.
+
+    Non-INFO logs send a blocking error notification, so this must not run
+    for every queued message.
+    """
+    global last_forward_warning
+
+    now = time.monotonic()
+    if now - last_forward_warning < FORWARD_WARNING_INTERVAL:
+        return
+    last_forward_warning = now
+    queued = sum(len(lane) for lane in forward_scheduler.lanes.values())
+    log_message(
+        f"TCP_CLIENT isn't Connected, {queued} messages queued for forwarding",
+        "WARNING",
+    )
+
+
+class ForwardScheduler:
+    """Sends queued messages over TCP from a dedicated thread, by priority.
+
+    Each lane is a bounded FIFO. The high lane is always emptied before the
+    next low-lane message is sent, and since sending happens off the event
+    loop, orders never wait behind logging, Telegram or persistence work.
+    While the client is disconnected messages stay queued, and ones older
+    than FORWARD_BACKLOG_MAX_AGE are dropped instead of sent late. Drops are
+    counted per lane and reported in one rate-limited warning.
+    """
+
+    LANES = ("high", "low")
+
+    def __init__(self, maxlen=FORWARD_BACKLOG_SIZE, max_age=FORWARD_BACKLOG_MAX_AGE):
+        self.lanes = {lane: collections.deque(maxlen=maxlen) for lane in self.LANES}
+        self.max_age_micros = max_age * 1_000_000
+        self.latency = {
+            "high": LatencyTracker(FORWARD_SLO_HIGH_MS),
+            "low": LatencyTracker(FORWARD_SLO_LOW_MS),
+        }
+        self.dropped = {lane: {"stale": 0, "overflow": 0} for lane in self.LANES}
+        self.last_drop_warning = None
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, lane, ts, payload):
+        queue = self.lanes[lane]
+        with self.condition:
+            if len(queue) == queue.maxlen:
+                self._drop(lane, "overflow")
+            queue.append((ts, payload))
+            self.condition.notify()
+        if lane == "high":
+            # Hand the GIL to the sender thread instead of finishing this slice
+            time.sleep(0)
+
+    def requeue(self, lane, ts, payload):
+        queue = self.lanes[lane]
+        with self.condition:
+            if len(queue) == queue.maxlen:
+                self._drop(lane, "overflow")
+            queue.appendleft((ts, payload))
+
+    def _drop(self, lane, reason):
+        self.dropped[lane][reason] += 1
+        counters["forward_dropped"] += 1
+
+        now = time.monotonic()
+        if (
+            self.last_drop_warning is not None
+            and now - self.last_drop_warning < FORWARD_WARNING_INTERVAL
+        ):
+            return
+        self.last_drop_warning = now
+        # Non-INFO logs block on the error notification, keep it off this thread
+        threading.Thread(
+            target=log_message,
+            args=(f"[TCP] Dropped queued messages: {self.dropped}", "WARNING"),
+            daemon=True,
+        ).start()
+
+    def _next(self):
+        for lane in self.LANES:
+            if self.lanes[lane]:
+                return lane, self.lanes[lane].popleft()
+
+    def _ready(self):
+        return tcp_client.connected and any(self.lanes.values())
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self._ready():
+                    if self.stop_event.is_set():
+                        return
+                    self.condition.wait(0.1)
+                lane, (ts, payload) = self._next()
+
+            age = epoch_micros() - ts
+            if age > self.max_age_micros:
+                with self.condition:
+                    self._drop(lane, "stale")
+                log_message(f"[TCP] Dropped stale queued message: {payload}", "INFO")
+                continue
+
+            try:
+                tcp_client.send_frame(payload)
+            except (BrokenPipeError, ConnectionError, OSError) as e:
+                # Requeue and reconnect; the age is checked again before resending
+                log_message(f"Lost connection while sending: {e}", "ERROR")
+                tcp_client.connected = False
+                self.requeue(lane, ts, payload)
+                tcp_client.connect()
+                continue
+            counters["forwarded"] += 1
+            self.latency[lane].record((epoch_micros() - ts) / 1000)
+
+    def stop(self, timeout=5.0):
+        """Stop after sending what is queued, waiting at most timeout seconds."""
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        self.thread.join(timeout)
+
+    def to_dict(self):
+        return {
+            lane: {
+                "queued": len(self.lanes[lane]),
+                "dropped": dict(self.dropped[lane]),
+                **self.latency[lane].to_dict(),
+            }
+            for lane in self.LANES
+        }
+
+
+def serialize_state_snapshot(clean=False):
+    """Serialize in-memory state to compact JSON for fast warm restarts."""
+    return json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "clean": clean,
+            "saved_at": epoch_micros(),
+            "last_seq": sequence.last_seq,
+            "recent_floor_seq": recent_messages.floor_seq,
+            "recent_messages": [m.to_dict() for m in recent_messages.messages],
+            "ignore_list": ignore_list,
+            "ignore_list_key": ignore_list_key,
+            "counters": counters,
+        },
+        separators=(",", ":"),
+    )
+
+
+def restore_state_snapshot():
+    """Restore in-memory state from STATE_SNAPSHOT_FILE, if present.
+
+    The recent-message buffer is only restored from a clean (shutdown)
+    snapshot; after a crash it may be missing messages, so resume requests
+    fall back to the history file instead.
+    """
+    global ignore_list, ignore_list_key, ignore_index
+
+    try:
+        with open(STATE_SNAPSHOT_FILE, "r") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return False
+    except ValueError as e:
+        log_message(f"[SNAPSHOT] Invalid snapshot, starting cold: {e}", "WARNING")
+        return False
+
+    if state.get("version") != SNAPSHOT_VERSION:
+        return False
+
+    counters.update(state.get("counters", {}))
+
+    snapshot_key = state.get("ignore_list_key")
+    if snapshot_key and tuple(snapshot_key) == file_key(IGNORE_LIST_FILE):
+        ignore_list = state.get("ignore_list", {})
+        ignore_index = build_ignore_index(ignore_list)
+        ignore_list_key = tuple(snapshot_key)
+
+    if state.get("clean") and state.get("last_seq", 0) <= sequence.last_seq:
+        recent_messages.floor_seq = state.get("recent_floor_seq", 0)
+        for message in state.get("recent_messages", []):
+            recent_messages.append(MessageRecord.from_dict(message))
+
+    log_message(
+        f"[SNAPSHOT] Restored state (clean={state.get('clean')}, "
+        f"{len(recent_messages.messages)} recent messages)",
+        "INFO",
+    )
+    return True
+
+
+async def snapshot_state_task():
+    """Periodically snapshot in-memory state, starting right after startup."""
+    while True:
+        try:
+            payload = serialize_state_snapshot(clean=False)
+            await asyncio.to_thread(write_file_atomic, STATE_SNAPSHOT_FILE, payload)
+        except Exception as e:
+            log_message(f"[SNAPSHOT] Failed to write snapshot: {e}", "ERROR")
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+
+class ClientState:
+    __slots__ = ("slot", "last_activity", "ping_sent_at")
+
+    def __init__(self, slot, now):
+        self.slot = slot
+        self.last_activity = now
+        self.ping_sent_at = None
+
+
+class HeartbeatWheel:
+    """Timer wheel driving heartbeats and reaping for every connection.
+
+    One task advances the wheel a slot per HEARTBEAT_TICK and only checks the
+    connections in that slot, so each connection is visited once per
+    HEARTBEAT_INTERVAL. Connections are pinged after HEARTBEAT_INTERVAL of
+    silence and reaped when the pong is late, when nothing was received for
+    IDLE_TIMEOUT (if set), or when their write buffer passes
+    WRITE_BUFFER_HIGH_WATER.
+    """
+
+    def __init__(self, interval=HEARTBEAT_INTERVAL, tick=HEARTBEAT_TICK):
+        self.tick = tick
+        self.slots = [set() for _ in range(max(1, round(interval / tick)))]
+        self.position = 0
+        self.clients = {}
+
+    def add(self, websocket):
+        # The slot just behind the cursor is reached after a full revolution
+        slot = (self.position - 1) % len(self.slots)
+        self.slots[slot].add(websocket)
+        self.clients[websocket] = ClientState(slot, time.monotonic())
+        connection_metrics["connected"] = len(self.clients)
+
+    def remove(self, websocket):
+        state = self.clients.pop(websocket, None)
+        if state:
+            self.slots[state.slot].discard(websocket)
+        connection_metrics["connected"] = len(self.clients)
+
+    def touch(self, websocket):
+        state = self.clients.get(websocket)
+        if state:
+            state.last_activity = time.monotonic()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.position = (self.position + 1) % len(self.slots)
+            now = time.monotonic()
+            for websocket in list(self.slots[self.position]):
+                self._check(websocket, now)
+
+    def _check(self, websocket, now):
+        state = self.clients[websocket]
+
+        if state.ping_sent_at and now - state.ping_sent_at > HEARTBEAT_TIMEOUT:
+            self.reap(websocket, "heartbeat_timeout")
+        elif 0 < IDLE_TIMEOUT < now - state.last_activity:
+            self.reap(websocket, "idle")
+        elif write_buffer_size(websocket) > WRITE_BUFFER_HIGH_WATER:
+            self.reap(websocket, "slow_consumer")
+        elif not state.ping_sent_at and now - state.last_activity >= HEARTBEAT_INTERVAL:
+            state.ping_sent_at = now
+            asyncio.create_task(self._ping(websocket, state))
+
+    async def _ping(self, websocket, state):
+        try:
+            pong_waiter = await websocket.ping()
+        except websockets.ConnectionClosed:
+            return
+        connection_metrics["pings_sent"] += 1
+        pong_waiter.add_done_callback(lambda waiter: self._pong(state, waiter))
+
+    def _pong(self, state, pong_waiter):
+        # The waiter fails when the connection closes before the pong
+        if pong_waiter.cancelled() or pong_waiter.exception():
+            return
+        # Only liveness: idle time counts from the last application frame
+        state.ping_sent_at = None
+
+    def reap(self, websocket, reason):
+        """Drop a dead or stuck connection without waiting for a close handshake."""
+        self.remove(websocket)
+        connected_clients.discard(websocket)
+        connection_metrics[f"reaped_{reason}"] += 1
+        log_message(
+            f"[WS] Reaped {reason} connection {websocket.remote_address}", "INFO"
+        )
+        if websocket.transport:
+            websocket.transport.abort()
+
+
+def write_buffer_size(websocket):
+    transport = websocket.transport
+    return transport.get_write_buffer_size() if transport else 0
+
+
+def broadcast(message):
+    """Send a message to every client without waiting on slow ones."""
+    targets = []
+    for client in connected_clients:
+        if write_buffer_size(client) > WRITE_BUFFER_HIGH_WATER:
+            connection_metrics["broadcast_skipped"] += 1
+            continue
+        targets.append(client)
+    websockets.broadcast(targets, message)
+
+
+def verify_token(token):
+    """Check a dashboard JWT issued by server.py."""
+    if not token:
+        return False
+    try:
+        jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        return True
+    except jwt.InvalidTokenError:
+        return False
+
+
+def request_token(path, request_headers=None):
+    """Get the JWT from the Authorization header or the ?token= query parameter."""
+    if request_headers:
+        auth_header = request_headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            return auth_header[7:]
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+    return query.get("token", [None])[0]
+
+
+def stats_payload():
+    """Live statistics together with server counters and connection metrics."""
+    return {
+        **stats.snapshot(),
+        "counters": counters,
+        "connections": connection_metrics,
+        "forward": forward_scheduler.to_dict() if forward_scheduler else None,
+        "loop": loop_watchdog.to_dict(),
+    }
+
+
+def json_response(status, data):
+    return (
+        status,
+        [("Content-Type", "application/json")],
+        json.dumps(data).encode(),
+    )
+
+
+async def stats_endpoint(query):
+    return json_response(http.HTTPStatus.OK, stats_payload())
+
+
+async def stalls_endpoint(query):
+    """Event loop lag and recent stalls, with the captured stacks."""
+    return json_response(http.HTTPStatus.OK, loop_watchdog.to_dict(include_stacks=True))
+
+
+async def profile_endpoint(query):
+    """Run the sampling profiler for ?seconds=N and return the folded stacks."""
+    try:
+        seconds = float(query.get("seconds", ["10"])[0])
+    except ValueError:
+        seconds = 0
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return json_response(
+            http.HTTPStatus.BAD_REQUEST,
+            {"error": f"seconds must be between 0 and {PROFILE_MAX_SECONDS}"},
+        )
+    if profiler.running:
+        return json_response(
+            http.HTTPStatus.CONFLICT, {"error": "A profile is already running"}
+        )
+
+    log_message(f"[PROFILE] Sampling all threads for {seconds}s", "INFO")
+    try:
+        folded = await asyncio.to_thread(profiler.run, seconds)
+    except RuntimeError:
+        # Another request started a profile between the check and the run
+        return json_response(
+            http.HTTPStatus.CONFLICT, {"error": "A profile is already running"}
+        )
+    filename = f"profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.folded"
+    return (
+        http.HTTPStatus.OK,
+        [
+            ("Content-Type", "text/plain; charset=utf-8"),
+            ("Content-Disposition", f'attachment; filename="{filename}"'),
+        ],
+        folded.encode(),
+    )
+
+
+HTTP_ENDPOINTS = {
+    "/stats": stats_endpoint,
+    "/admin/stalls": stalls_endpoint,
+    "/admin/profile": profile_endpoint,
+}
+
+
+async def process_http_request(path, request_headers):
+    """Serve authenticated HTTP endpoints on the WebSocket port."""
+    url = urllib.parse.urlparse(path)
+    endpoint = HTTP_ENDPOINTS.get(url.path)
+    if endpoint is None:
+        return None
+
+    if not verify_token(request_token(path, request_headers)):
+        return json_response(http.HTTPStatus.UNAUTHORIZED, {"error": "Unauthorized"})
+    return await endpoint(urllib.parse.parse_qs(url.query))
+
+
+def process_message(data, ignore_index, source="WS"):
+    """Run a published message through the ingest pipeline.
+
+    Normalizes and validates the ticker, applies the ignore list, then
+    forwards, broadcasts and queues accepted messages for saving. Returns the
+    record, or None if the message had no ticker.
+    """
+    global last_actual_message_time
+
+    last_actual_message_time = datetime.datetime.now()
+
+    sender = data.get("sender", "Unknown - Sender")
+    name = data.get("name", "Unknown - Sender Name")
+    message_type = data.get("type", "default")
+    ticker = data.get("ticker", "")
+    target = data.get("target", None)
+    shares = data.get("shares", None)
+
+    if not ticker or ticker == "":
+        return None
+
+    ticker = normalize_ticker(ticker)
+    if not ticker:
+        return None
+
+    counters["received"] += 1
+
+    ignored = should_ignore_message(sender, ticker, ignore_index)
+    unknown_ticker = (
+        not ignored
+        and symbol_master is not None
+        and len(symbol_master) > 0
+        and ticker not in symbol_master
+    )
+
+    record = MessageRecord(
+        seq=sequence.next(),
+        ts=epoch_micros(),
+        sender=sender,
+        name=name,
+        message_type=message_type,
+        ticker=ticker,
+        shares=str(shares) if shares else None,
+        target=target or None,
+        old_message=None if shares else False,
+        unknown_ticker=unknown_ticker and UNKNOWN_TICKER_ACTION != "pass",
+    )
+    timestamp = record.timestamp
+
+    if unknown_ticker:
+        counters["unknown_ticker"] += 1
+
+    rejected = unknown_ticker and UNKNOWN_TICKER_ACTION == "reject"
+    stats.record(record.sender, record.ticker, record.type, ignored or rejected)
+
+    if ignored:
+        pending_ignored_messages.append(record)
+        counters["ignored"] += 1
+        log_message(f"Ignored message: {record.to_dict()}", "INFO")
+    elif rejected:
+        pending_ignored_messages.append(record)
+        counters["rejected"] += 1
+        log_message(f"Rejected unknown ticker: {record.to_dict()}", "INFO")
+    else:
+        # Forward the message to the TCP server first
+        if not data.get("processed", False):
+            forward_message(record)
+
+        broadcast(record.to_json())
+
+        pending_messages.append(record)
+        recent_messages.append(record)
+        counters["accepted"] += 1
+
+        message = (
+            f"<b>New Message Received</b>\n\n"
+            f"<b>Ticker:</b> {record.ticker.upper()}\n"
+            f"<b>Sender:</b> {record.sender}\n"
+            f"<b>Name:</b> {record.name}\n"
+            f"<b>Type:</b> {record.type}\n"
+            f"<b>Timestamp:</b> {timestamp}\n"
+        )
+
+        if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+            asyncio.create_task(
+                send_telegram_message(
+                    message,
+                    TELEGRAM_BOT_TOKEN,
+                    TELEGRAM_CHAT_ID,
+                )
+            )
+
+    log_message(f"[{source}] [{timestamp}] - RECEIVED - {data}", "INFO")
+    return record
+
+
 connected_clients = set()
 tcp_client = None
 
 
 async def handle_websocket(websocket, path):
     """Handle WebSocket connections and messages."""
-    global last_actual_message_time, pending_messages, pending_ignored_messages, tcp_client
+    global last_actual_message_time
 
     connected_clients.add(websocket)
-    ignore_list = load_ignore_list()
+    heartbeat_wheel.add(websocket)
+    ignore_index = get_ignore_index()
+    authorized = None
 
     try:
         async for message in websocket:
+            heartbeat_wheel.touch(websocket)
             data = json.loads(message)
 
             # ping (1) & pong (2)
             if data == "[1":
                 await websocket.send("[2")
                 continue
+            elif data.get("request_stats", False):
+                if authorized is None:
+                    authorized = verify_token(request_token(path))
+                if authorized:
+                    await websocket.send(json.dumps({"stats": stats_payload()}))
+                else:
+                    await websocket.send(
+                        json.dumps({"stats": None, "error": "Unauthorized"})
+                    )
+                continue
             elif data.get("request_old_messages", False):
                 last_actual_message_time = datetime.datetime.now()
-                old_messages = load_messages(MESSAGES_FILE)
-                for msg in old_messages:
-                    msg["old_message"] = True
-                await websocket.send(json.dumps(old_messages))
+                since_seq = data.get("since_seq")
+                resume_from = parse_since_seq(since_seq)
+                if since_seq is None:
+                    old_messages = [
+                        msg.to_dict(old_message=True) for msg in load_old_messages()
+                    ]
+                    await websocket.send(json.dumps(old_messages))
+                elif resume_from is None:
+                    log_message(f"[WS] Invalid since_seq: {since_seq!r}", "INFO")
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "since_seq": since_seq,
+                                "messages": None,
+                                "error": "Invalid since_seq",
+                            }
+                        )
+                    )
+                else:
+                    missed = get_messages_since(resume_from)
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "since_seq": since_seq,
+                                "last_seq": sequence.last_seq,
+                                "messages": [
+                                    msg.to_dict(old_message=True) for msg in missed
+                                ],
+                            }
+                        )
+                    )
                 continue
 
-            last_actual_message_time = datetime.datetime.now()
+            process_message(data, ignore_index)
 
-            sender = data.get("sender", "Unknown - Sender")
-            name = data.get("name", "Unknown - Sender Name")
-            message_type = data.get("type", "default")
-            ticker = data.get("ticker", "")
-            target = data.get("target", None)
-            shares = data.get("shares", None)
-            timestamp = datetime.datetime.now(pytz.timezone("US/Eastern")).strftime(
-                "%Y-%m-%d %H:%M:%S.%f"
-            )
+    except websockets.ConnectionClosed:
+        log_message("[WS] WebSocket connection closed", "INFO")
+    except Exception as e:
+        log_message(f"[WS] WebSocket error: {e}", "ERROR")
+    finally:
+        connected_clients.discard(websocket)
+        heartbeat_wheel.remove(websocket)
 
-            if not ticker or ticker == "":
-                continue
 
-            message_data = {
-                "sender": sender,
-                "name": name,
-                "type": message_type,
-                "timestamp": timestamp,
-                "ticker": ticker,
-                "old_message": False,
-            }
+async def handle_uds_client(reader, writer):
+    """Handle a local publisher on the Unix domain socket.
 
-            if shares:
-                message_data["shares"] = str(shares)
-                message_data.pop("old_message")
-
-            if target:
-                message_data["target"] = target
-
-            if should_ignore_message(sender, ticker, ignore_list):
-                pending_ignored_messages.append(message_data)
-                log_message(f"Ignored message: {message_data}", "INFO")
-            else:
-                # Forward the message to the TCP server first
-                if tcp_client and tcp_client.connected:
-                    if not data.get("processed", False):
-                        tcp_client.send_message(json.dumps(message_data))
-                else:
-                    log_message("TCP_CLIENT isn't Connected check why", "CRITICAL")
+    Frames are a 4-byte big-endian length followed by a JSON message, or a
+    JSON array of messages for batched submits; the `<END>` suffix used by
+    EncryptedTcpClient is accepted too. Messages go through the same
+    pipeline as WebSocket publishers, without handshake or framing cost.
+    """
+    connection_metrics["uds_connected"] += 1
 
-                broadcast_message = json.dumps(message_data)
-                await asyncio.gather(
-                    *[client.send(broadcast_message) for client in connected_clients]
-                )
-
-                pending_messages.append(message_data)
-
-                message = (
-                    f"<b>New Message Received</b>\n\n"
-                    f"<b>Ticker:</b> {message_data['ticker'].upper()}\n"
-                    f"<b>Sender:</b> {message_data['sender']}\n"
-                    f"<b>Name:</b> {message_data['name']}\n"
-                    f"<b>Type:</b> {message_data['type']}\n"
-                    f"<b>Timestamp:</b> {message_data['timestamp']}\n"
+    try:
+        while True:
+            (length,) = struct.unpack("!I", await reader.readexactly(4))
+            if length > UDS_MAX_FRAME:
+                log_message(
+                    f"[UDS] Frame of {length} bytes exceeds UDS_MAX_FRAME, closing",
+                    "WARNING",
                 )
+                break
 
-                asyncio.create_task(
-                    send_telegram_message(
-                        message,
-                        TELEGRAM_BOT_TOKEN,
-                        TELEGRAM_CHAT_ID,
-                    )
-                )
+            payload = await reader.readexactly(length)
+            if payload.endswith(b"<END>"):
+                payload = payload[:-5]
+            try:
+                data = json.loads(payload)
+            except ValueError as e:
+                log_message(f"[UDS] Invalid JSON frame: {e}", "WARNING")
+                continue
 
-            log_message(f"[WS] [{timestamp}] - RECEIVED - {data}", "INFO")
+            ignore_index = get_ignore_index()
+            for message in data if isinstance(data, list) else [data]:
+                if isinstance(message, dict):
+                    process_message(message, ignore_index, source="UDS")
 
-    except websockets.ConnectionClosed:
-        log_message("[WS] WebSocket connection closed", "INFO")
+    except asyncio.IncompleteReadError:
+        pass
     except Exception as e:
-        log_message(f"[WS] WebSocket error: {e}", "ERROR")
+        log_message(f"[UDS] Connection error: {e}", "ERROR")
     finally:
-        connected_clients.remove(websocket)
+        connection_metrics["uds_connected"] -= 1
+        writer.close()
+
+
+async def start_uds_server():
+    """Listen on UDS_PATH, replacing a socket file left by a previous run."""
+    try:
+        if stat.S_ISSOCK(os.stat(UDS_PATH).st_mode):
+            os.unlink(UDS_PATH)
+    except FileNotFoundError:
+        pass
+
+    server = await asyncio.start_unix_server(handle_uds_client, path=UDS_PATH)
+    os.chmod(UDS_PATH, UDS_MODE)
+    log_message(f"Unix socket ingress listening on {UDS_PATH}", "INFO")
+    return server
 
 
 async def save_messages_after_delay():
     """Save pending messages after a delay if no new actual messages arrive."""
-    global pending_messages, pending_ignored_messages
-
     while True:
         await asyncio.sleep(SAVE_DELAY)
         time_since_last_message = (
@@ -401,49 +1260,101 @@ async def save_messages_after_delay():
         # If enough time has passed since last actual message, save the pending messages
         if time_since_last_message >= SAVE_DELAY:
             if pending_messages:
-                messages_to_save = pending_messages.copy()
-                pending_messages = []
-                save_messages_to_file(messages_to_save, MESSAGES_FILE)
-                log_message(f"Saved {len(messages_to_save)} messages to file", "INFO")
+                saved = await save_pending_messages(pending_messages, MESSAGES_FILE)
+                log_message(f"Saved {saved} messages to file", "INFO")
 
             if pending_ignored_messages:
-                ignored_to_save = pending_ignored_messages.copy()
-                pending_ignored_messages = []
-                save_messages_to_file(ignored_to_save, IGNORED_MESSAGES_FILE)
-                log_message(
-                    f"Saved {len(ignored_to_save)} ignored messages to file", "INFO"
+                saved = await save_pending_messages(
+                    pending_ignored_messages, IGNORED_MESSAGES_FILE
                 )
+                log_message(f"Saved {saved} ignored messages to file", "INFO")
 
 
 async def main():
     """Start the WebSocket server, TCP client, backup task, and background save task."""
-    global tcp_client, backup_task
+    global tcp_client, backup_task, sequence, recent_messages, heartbeat_wheel
+    global forward_scheduler
+
+    started_at = time.perf_counter()
+
+    sequence = SequenceCounter(SEQUENCE_FILE)
+    recent_messages = RecentMessages(RECENT_BUFFER_SIZE, floor_seq=sequence.last_seq)
+    restore_state_snapshot()
+    get_ignore_index()
+    if symbol_master:
+        if UNKNOWN_TICKER_ACTION not in UNKNOWN_TICKER_ACTIONS:
+            raise ValueError(
+                f"UNKNOWN_TICKER_ACTION must be one of {UNKNOWN_TICKER_ACTIONS}"
+            )
+        reload_symbol_master()
 
-    # Initialize and start TCP client in a separate thread
     tcp_client = EncryptedTcpClient(
         tcp_host=TCP_HOST,
         tcp_port=TCP_PORT,
         shared_secret=TCP_SECRET,
         client_name="websocket_client",
     )
-    tcp_client.connect()
-    save_task = asyncio.create_task(save_messages_after_delay())
-    backup_task = asyncio.create_task(daily_backup_task())
 
+    forward_scheduler = ForwardScheduler()
+    heartbeat_wheel = HeartbeatWheel()
+
+    # Bind first so publishers are accepted while the TCP client connects
     server = await websockets.serve(
-        handle_websocket, WS_HOST, WS_PORT, ping_interval=None, ping_timeout=None
+        handle_websocket,
+        WS_HOST,
+        WS_PORT,
+        ping_interval=None,
+        ping_timeout=None,
+        process_request=process_http_request,
     )
+    log_message(
+        f"WebSocket server running on ws://{WS_HOST}:{WS_PORT}, ready in "
+        f"{(time.perf_counter() - started_at) * 1000:.1f} ms",
+        "INFO",
+    )
+    uds_server = await start_uds_server() if UDS_PATH else None
+
+    # Connect to the TCP server and forward messages from separate threads
+    threading.Thread(target=tcp_client.connect, daemon=True).start()
+    forward_scheduler.start()
+    heartbeat_task = asyncio.create_task(heartbeat_wheel.run())
+    watchdog_task = asyncio.create_task(loop_watchdog.run())
+    save_task = asyncio.create_task(save_messages_after_delay())
+    backup_task = asyncio.create_task(daily_backup_task())
+    snapshot_task = asyncio.create_task(snapshot_state_task())
+    if symbol_master:
+        asyncio.create_task(symbol_master_reload_task())
+    asyncio.create_task(asyncio.to_thread(load_history))
 
-    log_message(f"WebSocket server running on ws://{WS_HOST}:{WS_PORT}", "INFO")
     log_message(f"TCP client connecting to {TCP_HOST}:{TCP_PORT}", "INFO")
     log_message(
         f"Messages will be saved after {SAVE_DELAY} seconds of inactivity", "INFO"
     )
     log_message("Daily backup task started", "INFO")
+    idle_timeout = f"{IDLE_TIMEOUT}s" if IDLE_TIMEOUT > 0 else "disabled"
+    log_message(
+        f"Heartbeat every {HEARTBEAT_INTERVAL}s, idle timeout {idle_timeout}", "INFO"
+    )
 
     try:
         await server.wait_closed()
     finally:
+        if uds_server:
+            uds_server.close()
+            try:
+                os.unlink(UDS_PATH)
+            except FileNotFoundError:
+                pass
+
+        for task in (heartbeat_task, watchdog_task, snapshot_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(forward_scheduler.stop)
+        tcp_client.disconnect()
+
         if save_task:
             save_task.cancel()
             try:
@@ -470,6 +1381,9 @@ async def main():
                 "INFO",
             )
 
+        write_file_atomic(STATE_SNAPSHOT_FILE, serialize_state_snapshot(clean=True))
+        log_message("[SNAPSHOT] Saved state snapshot", "INFO")
+
 
 if __name__ == "__main__":
     asyncio.run(main())